@@ -3,24 +3,46 @@
 
 import curses
 import locale
+import math
+import os
 import random
+import select
 import signal
 import sys
 import time
-from dataclasses import dataclass, field
+import unicodedata
+from array import array
+from itertools import compress
 
 # Character sets
 KATAKANA = "アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモヤユヨラリルレロワヲン"
 ASCII_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz!@#$%^&*()_+-=[]{}|;:',.<>?/"
 CHAR_SET = list(KATAKANA + ASCII_CHARS)
+CHAR_INDICES = range(len(CHAR_SET))
+
+# Frame buffers hold one byte per cell, an index into GLYPHS; BLANK marks an
+# empty cell
+BLANK = len(CHAR_SET)
+GLYPHS = CHAR_SET + [" "]
+NONZERO = bytes([0]) + bytes([1]) * 255  # bytes.translate table: nonzero -> 1
+GLYPH_BYTES = [g.encode("utf-8") for g in GLYPHS]  # Pre-encoded for ANSI output
+
+# Full-width glyphs (the katakana) advance the terminal cursor two cells, so
+# a run of cells written in one go must end at one
+WIDE_GLYPHS = bytearray(unicodedata.east_asian_width(g) in "WF" for g in GLYPHS)
 
 # Speed tiers (cells per second) - 1x/2x/3x for depth perception
 SPEED_TIERS = [8.0, 16.0, 24.0]
 
 # Visual parameters
 TRAIL_LENGTH_RANGE = (8, 25)
+TRAIL_LENGTHS = range(TRAIL_LENGTH_RANGE[0], TRAIL_LENGTH_RANGE[1] + 1)
+MAX_TRAIL = TRAIL_LENGTH_RANGE[1]  # Row stride of the per-column character matrix
+SPAWN_WIDTH_PER_COLUMN = 30  # Allow one spawn per frame per this many cells of width
+DEAD_COMPACT_RATIO = 0.25  # Compact column arrays once this fraction is dead
 COLUMN_DENSITY = 0.65  # 60-70%
 MUTATION_RATE = 0.10  # 10% per frame
+MUTATION_LOG_KEEP = math.log1p(-MUTATION_RATE)  # For geometric gap sampling
 
 # Timing
 TARGET_FPS = 30
@@ -30,6 +52,14 @@ FRAME_TIME = 1.0 / TARGET_FPS
 MIN_WIDTH = 20
 MIN_HEIGHT = 10
 
+# Write frames as raw ANSI escapes (one write per frame); other platforms
+# draw through curses instead
+ANSI_OUTPUT = os.name == "posix"
+
+# Check stdin with select() before asking curses for keys; Windows select()
+# only accepts sockets
+SELECT_INPUT = os.name == "posix"
+
 # Color pair indices
 COLOR_HEAD = 1
 COLOR_BRIGHT = 2
@@ -37,62 +67,53 @@ COLOR_MEDIUM = 3
 COLOR_DIM = 4
 
 
-@dataclass
-class Column:
-    """Represents a single falling rain column."""
-
-    x: int
-    screen_height: int
-    y_head: float = 0.0
-    speed_tier: int = field(default_factory=lambda: random.randint(0, 2))
-    trail_length: int = field(default_factory=lambda: random.randint(*TRAIL_LENGTH_RANGE))
-    characters: list[str] = field(default_factory=list)
-    active: bool = True
-
-    def __post_init__(self):
-        self.speed = SPEED_TIERS[self.speed_tier]
-        if not self.characters:
-            self.characters = [random.choice(CHAR_SET) for _ in range(self.trail_length)]
-
-    def update(self, delta_time: float) -> None:
-        """Move column down by delta_time * speed."""
-        self.y_head += self.speed * delta_time
-
-        # Check if fully off screen (head + trail length past bottom)
-        if self.y_head - self.trail_length > self.screen_height:
-            self.active = False
-
-    def mutate(self) -> None:
-        """Randomly mutate characters based on MUTATION_RATE."""
-        for i in range(len(self.characters)):
-            if random.random() < MUTATION_RATE:
-                self.characters[i] = random.choice(CHAR_SET)
-
-    def get_visible_cells(self) -> list[tuple[int, int, str, int]]:
-        """Return list of (x, y, char, color_pair) for visible cells."""
-        cells = []
-        head_y = int(self.y_head)
-
-        for i in range(self.trail_length):
-            y = head_y - i
-            if 0 <= y < self.screen_height:
-                char = self.characters[i % len(self.characters)]
-                color = self._get_color_for_position(i)
-                cells.append((self.x, y, char, color))
-
-        return cells
-
-    def _get_color_for_position(self, pos: int) -> int:
-        """Determine color pair based on position in trail."""
-        if pos == 0:
-            return COLOR_HEAD  # White head
-        ratio = pos / self.trail_length
+def _trail_colors(trail_length: int) -> list[int]:
+    """Color pair for each position in a trail of the given length."""
+    colors = [COLOR_HEAD]  # White head
+    for pos in range(1, trail_length):
+        ratio = pos / trail_length
         if ratio < 0.33:
-            return COLOR_BRIGHT  # Bright green
+            colors.append(COLOR_BRIGHT)  # Bright green
         elif ratio < 0.66:
-            return COLOR_MEDIUM  # Medium green
+            colors.append(COLOR_MEDIUM)  # Medium green
         else:
-            return COLOR_DIM  # Dim green
+            colors.append(COLOR_DIM)  # Dim green
+    return colors
+
+
+# Trail color gradients, indexed by trail length then position in trail
+COLOR_LUT = [_trail_colors(n) for n in range(MAX_TRAIL + 1)]
+
+
+def build_frame(
+    cur_chars, cur_colors, columns, x_pos, y_head, trail_length, chars, width, height
+) -> None:
+    """Write the visible cells of the given columns into the flat frame buffers."""
+    color_lut = COLOR_LUT
+    for c in columns:
+        x = x_pos[c]
+        head_y = int(y_head[c])
+        length = trail_length[c]
+        base = c * MAX_TRAIL
+        colors = color_lut[length]
+        # Clamp the trail to the screen rather than bounds-checking each cell
+        for y in range(max(0, head_y - length + 1), min(height, head_y + 1)):
+            i = head_y - y
+            idx = y * width + x
+            cur_chars[idx] = chars[base + i]
+            cur_colors[idx] = colors[i]
+
+
+def diff_frames(cur_chars, prev_chars, cur_colors, prev_colors) -> bytes:
+    """Return a mask that is 1 for every cell whose glyph or color changed.
+
+    The buffers are XORed as big integers, which keeps the whole comparison
+    in C instead of looping over cells in Python.
+    """
+    diff = (int.from_bytes(cur_chars, "little") ^ int.from_bytes(prev_chars, "little")) | (
+        int.from_bytes(cur_colors, "little") ^ int.from_bytes(prev_colors, "little")
+    )
+    return diff.to_bytes(len(cur_chars), "little").translate(NONZERO)
 
 
 class MatrixRain:
@@ -102,16 +123,33 @@ class MatrixRain:
         self.stdscr = stdscr
         self.height = 0
         self.width = 0
-        self.columns: list[Column] = []
-        self.column_slots: set[int] = set()  # Active x positions
+        self.target_count = 0  # Columns needed for COLUMN_DENSITY
+        self.max_spawn = 0  # Spawn cap per frame
+        # Column state, stored as one array per field (index = column)
+        self.x_pos: list[int] = []
+        self.y_head: list[float] = []
+        self.speed: list[float] = []
+        self.trail_length: list[int] = []
+        self.chars = array("H")  # CHAR_SET indices, MAX_TRAIL per column
+        self.active = bytearray()  # 0 once a column has left the screen
+        self.on_screen: list[int] = []  # Columns with at least one visible cell
+        self.free_slots: list[int] = []  # Unoccupied x positions
         self.running = True
-        self.prev_frame: dict[tuple[int, int], tuple[str, int]] = {}
+        # Flat frame buffers (index = y * width + x), swapped every frame
+        self.prev_chars = bytearray()
+        self.prev_colors = bytearray()
+        self.cur_chars = bytearray()
+        self.cur_colors = bytearray()
+        self.blank_chars = b""
+        self.blank_colors = b""
+        self.sgr: list[bytes] = []  # ANSI color escape per color pair index
+        self.cp: list[int] = []  # curses attribute per color pair index
+        # Pieces of the ANSI cursor-position escape, per row and per column
+        self.cup_rows: list[bytes] = []
+        self.cup_cols: list[bytes] = []
 
     def setup(self) -> None:
         """Initialize curses settings and validate terminal."""
-        # Initialize locale for proper Unicode rendering
-        locale.setlocale(locale.LC_ALL, "")
-
         # Hide cursor (some terminals don't support this)
         try:
             curses.curs_set(0)
@@ -124,6 +162,8 @@ class MatrixRain:
 
         # Get terminal size
         self.height, self.width = self.stdscr.getmaxyx()
+        self.target_count = int(self.width * COLUMN_DENSITY)
+        self.max_spawn = max(1, self.width // SPAWN_WIDTH_PER_COLUMN)
 
         # Validate minimum size
         if self.width < MIN_WIDTH or self.height < MIN_HEIGHT:
@@ -138,6 +178,19 @@ class MatrixRain:
         # Clear screen and set background
         self.stdscr.bkgd(" ", curses.color_pair(0))
         self.stdscr.clear()
+        self.stdscr.refresh()
+
+        # Allocate frame buffers; the previous frame starts blank, matching
+        # the cleared screen
+        size = self.width * self.height
+        self.blank_chars = bytes([BLANK]) * size
+        self.blank_colors = bytes(size)
+        self.prev_chars = bytearray(self.blank_chars)
+        self.prev_colors = bytearray(size)
+        self.cur_chars = bytearray(self.blank_chars)
+        self.cur_colors = bytearray(size)
+        self.cup_rows = [b"\x1b[%d;" % (y + 1) for y in range(self.height)]
+        self.cup_cols = [b"%dH" % (x + 1) for x in range(self.width)]
 
         # Initialize columns at full density
         self._spawn_initial_columns()
@@ -160,118 +213,255 @@ class MatrixRain:
             curses.init_pair(COLOR_BRIGHT, 46, -1)
             curses.init_pair(COLOR_MEDIUM, 40, -1)
             curses.init_pair(COLOR_DIM, 34, -1)
+            self.sgr = [b"\x1b[39m"] + [b"\x1b[38;5;%dm" % c for c in (255, 46, 40, 34)]
         else:
             # Fallback to 8-color mode
             curses.init_pair(COLOR_HEAD, curses.COLOR_WHITE, -1)
             curses.init_pair(COLOR_BRIGHT, curses.COLOR_GREEN, -1)
             curses.init_pair(COLOR_MEDIUM, curses.COLOR_GREEN, -1)
             curses.init_pair(COLOR_DIM, curses.COLOR_GREEN, -1)
+            self.sgr = [b"\x1b[39m", b"\x1b[37m", b"\x1b[32m", b"\x1b[32m", b"\x1b[32m"]
+
+        # color_pair() results only depend on the pair index
+        self.cp = [curses.color_pair(i) for i in range(COLOR_DIM + 1)]
+
+    def _add_column(self, x: int, trail_length: int, y_head: float) -> None:
+        """Append a column with a random speed tier and characters."""
+        # Every trail position has its own character, so build_frame can index
+        # the row directly
+        assert trail_length <= MAX_TRAIL
+        self.x_pos.append(x)
+        self.y_head.append(y_head)
+        self.speed.append(random.choice(SPEED_TIERS))
+        self.trail_length.append(trail_length)
+        self.chars.extend(random.choices(CHAR_INDICES, k=MAX_TRAIL))
+        self.active.append(1)
 
     def _spawn_initial_columns(self) -> None:
         """Spawn columns to achieve target density immediately."""
-        target_count = int(self.width * COLUMN_DENSITY)
-        available_slots = list(range(self.width))
-        random.shuffle(available_slots)
-
-        for x in available_slots[:target_count]:
-            col = Column(x=x, screen_height=self.height)
-            # Randomize starting position for varied entry
-            col.y_head = random.uniform(-col.trail_length, self.height)
-            self.columns.append(col)
-            self.column_slots.add(x)
+        count = self.target_count
+        slots = list(range(self.width))
+        random.shuffle(slots)
+        self.x_pos = slots[:count]
+        self.free_slots = slots[count:]
+
+        # Draw every column's attributes in bulk
+        self.trail_length = random.choices(TRAIL_LENGTHS, k=count)
+        self.speed = random.choices(SPEED_TIERS, k=count)
+        self.chars = array("H", random.choices(CHAR_INDICES, k=count * MAX_TRAIL))
+        self.active = bytearray(b"\x01") * count
+
+        # Randomize starting position for varied entry
+        height = self.height
+        self.y_head = [random.uniform(-t, height) for t in self.trail_length]
 
     def _spawn_new_column(self) -> None:
         """Spawn a new column at random available position."""
-        available = [x for x in range(self.width) if x not in self.column_slots]
-        if available:
-            x = random.choice(available)
-            col = Column(x=x, screen_height=self.height)
-            col.y_head = 0.0  # Start from top
-            self.columns.append(col)
-            self.column_slots.add(x)
+        free_slots = self.free_slots
+        if free_slots:
+            # Swap a random free slot to the end so it can be popped in O(1)
+            i = random.randrange(len(free_slots))
+            free_slots[i], free_slots[-1] = free_slots[-1], free_slots[i]
+            x = free_slots.pop()
+            # Start from top
+            self._add_column(x, random.randint(*TRAIL_LENGTH_RANGE), 0.0)
+
+    def _mutate(self) -> None:
+        """Randomly mutate on-screen characters based on MUTATION_RATE.
+
+        Instead of rolling once per character, the gaps between mutated cells
+        are drawn from a geometric distribution, so RNG work scales with the
+        number of mutations rather than the number of characters.
+        """
+        chars = self.chars
+        on_screen = self.on_screen
+        total = len(on_screen) * MAX_TRAIL
+        positions = []
+        i = int(math.log(1.0 - random.random()) / MUTATION_LOG_KEEP)
+        while i < total:
+            positions.append(i)
+            i += 1 + int(math.log(1.0 - random.random()) / MUTATION_LOG_KEEP)
+
+        # Positions index the on-screen columns' rows laid end to end
+        for i, char in zip(positions, random.choices(CHAR_INDICES, k=len(positions))):
+            c, offset = divmod(i, MAX_TRAIL)
+            chars[on_screen[c] * MAX_TRAIL + offset] = char
+
+    def _compact_columns(self) -> None:
+        """Drop dead columns from every column array."""
+        keep = self.active
+        self.x_pos = list(compress(self.x_pos, keep))
+        self.y_head = list(compress(self.y_head, keep))
+        self.speed = list(compress(self.speed, keep))
+        self.trail_length = list(compress(self.trail_length, keep))
+
+        chars = array("H")
+        for c in compress(range(len(keep)), keep):
+            chars.extend(self.chars[c * MAX_TRAIL : (c + 1) * MAX_TRAIL])
+        self.chars = chars
+        self.active = bytearray(b"\x01") * len(self.x_pos)
 
     def update(self, delta_time: float) -> None:
         """Update all columns and manage spawning."""
-        # Update existing columns
-        for col in self.columns:
-            col.update(delta_time)
-            col.mutate()
-
-        # Remove inactive columns
-        inactive = [c for c in self.columns if not c.active]
-        for col in inactive:
-            self.column_slots.discard(col.x)
-        self.columns = [c for c in self.columns if c.active]
-
-        # Spawn replacements to maintain density
-        target_count = int(self.width * COLUMN_DENSITY)
-        while len(self.column_slots) < target_count:
+        # Move every column down by delta_time * speed
+        self.y_head = [y + s * delta_time for y, s in zip(self.y_head, self.speed)]
+
+        # Retire columns fully off screen (head + trail length past bottom).
+        # Dead columns draw nothing, so they stay in the arrays until enough
+        # accumulate to be worth compacting
+        height = self.height
+        active = self.active
+        newly_dead = [
+            c
+            for c, (y, t) in enumerate(zip(self.y_head, self.trail_length))
+            if y - t > height and active[c]
+        ]
+        if newly_dead:
+            for c in newly_dead:
+                active[c] = 0
+                self.free_slots.append(self.x_pos[c])
+            if active.count(0) > len(active) * DEAD_COMPACT_RATIO:
+                self._compact_columns()
+
+        # Spawn replacements to maintain density, capped per frame so a wave
+        # of simultaneous deaths refills over several frames
+        spawned = 0
+        while self.width - len(self.free_slots) < self.target_count and spawned < self.max_spawn:
             self._spawn_new_column()
+            spawned += 1
+
+        # Only columns with a visible cell (head row >= 0 and tail row above
+        # the bottom) need mutating or drawing
+        self.on_screen = [
+            c
+            for c, (y, t) in enumerate(zip(self.y_head, self.trail_length))
+            if -1.0 < y < height + t - 1
+        ]
+        self._mutate()
 
     def render(self) -> None:
-        """Render frame with differential updates."""
+        """Render frame with differential updates, batched into per-row runs."""
+        width = self.width
+        height = self.height
+        cur_chars = self.cur_chars
+        cur_colors = self.cur_colors
+        cur_chars[:] = self.blank_chars
+        cur_colors[:] = self.blank_colors
+
         # Build current frame state
-        current_frame: dict[tuple[int, int], tuple[str, int]] = {}
-
-        for col in self.columns:
-            for x, y, char, color in col.get_visible_cells():
-                # Avoid bottom-right corner (curses quirk)
-                if 0 <= x < self.width and 0 <= y < self.height:
-                    if x == self.width - 1 and y == self.height - 1:
-                        continue
-                    current_frame[(x, y)] = (char, color)
-
-        # Clear cells that were drawn last frame but not this frame
-        for pos in self.prev_frame:
-            if pos not in current_frame:
-                x, y = pos
-                try:
-                    self.stdscr.addch(y, x, " ")
-                except curses.error:
-                    pass
-
-        # Draw new/changed cells
-        for pos, (char, color) in current_frame.items():
-            if pos not in self.prev_frame or self.prev_frame[pos] != (char, color):
-                x, y = pos
-                try:
-                    self.stdscr.addch(y, x, char, curses.color_pair(color))
-                except curses.error:
-                    pass
-
-        self.prev_frame = current_frame
-        self.stdscr.refresh()
+        build_frame(
+            cur_chars,
+            cur_colors,
+            self.on_screen,
+            self.x_pos,
+            self.y_head,
+            self.trail_length,
+            self.chars,
+            width,
+            height,
+        )
+
+        # Avoid bottom-right corner (curses quirk)
+        cur_chars[-1] = BLANK
+        cur_colors[-1] = 0
+
+        prev_chars = self.prev_chars
+        prev_colors = self.prev_colors
+        sgr = self.sgr
+        cp = self.cp
+        cup_rows = self.cup_rows
+        cup_cols = self.cup_cols
+        out = bytearray()
+        out_color = -1
+
+        changed = diff_frames(cur_chars, prev_chars, cur_colors, prev_colors)
+
+        # Emit each run of changed, same-colored cells with a single write;
+        # unchanged spans are skipped with bytes.find, and a run never
+        # continues past a full-width glyph
+        for y in range(self.height):
+            row = y * width
+            row_end = row + width
+            idx = changed.find(1, row, row_end)
+            while idx != -1:
+                color = cur_colors[idx]
+                end = idx + 1
+                while (
+                    end < row_end
+                    and changed[end]
+                    and cur_colors[end] == color
+                    and not WIDE_GLYPHS[cur_chars[end - 1]]
+                ):
+                    end += 1
+                start = idx - row
+                run = cur_chars[idx:end]
+                if ANSI_OUTPUT:
+                    out += cup_rows[y]
+                    out += cup_cols[start]
+                    if color != out_color:
+                        out += sgr[color]
+                        out_color = color
+                    out += b"".join([GLYPH_BYTES[g] for g in run])
+                else:
+                    run = "".join([GLYPHS[g] for g in run])
+                    try:
+                        self.stdscr.addstr(y, start, run, cp[color])
+                    except curses.error:
+                        pass
+                idx = changed.find(1, end, row_end)
+
+        self.prev_chars, self.cur_chars = cur_chars, prev_chars
+        self.prev_colors, self.cur_colors = cur_colors, prev_colors
+
+        if not ANSI_OUTPUT:
+            self.stdscr.refresh()
+        elif out:
+            # Reset attributes so the terminal is never left colored on exit
+            out += b"\x1b[0m"
+            self._write_frame(out)
+
+    def _write_frame(self, data: bytearray) -> None:
+        """Write a frame to stdout, bypassing curses."""
+        fd = sys.stdout.fileno()
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view) :]
+
+    def _handle_input(self) -> None:
+        """Drain pending keys, stopping on quit key (q)."""
+        try:
+            key = self.stdscr.getch()
+            while key != -1:
+                if key == ord("q"):
+                    self.running = False
+                key = self.stdscr.getch()
+        except curses.error:
+            pass
 
     def run(self) -> None:
-        """Main loop with frame pacing."""
+        """Main loop with fixed-step frame pacing."""
         self.setup()
-        last_time = time.monotonic()
+        next_frame = time.monotonic()
 
         while self.running:
-            current_time = time.monotonic()
-            delta_time = current_time - last_time
+            # Check for quit key (q), skipping curses entirely when idle
+            if not SELECT_INPUT or select.select([sys.stdin], [], [], 0)[0]:
+                self._handle_input()
 
-            # Check for quit key (q)
-            try:
-                key = self.stdscr.getch()
-                if key == ord("q"):
-                    self.running = False
-            except curses.error:
-                pass
-
-            # Update simulation
-            self.update(delta_time)
+            # Update simulation by one fixed step
+            self.update(FRAME_TIME)
 
             # Render
             self.render()
 
-            # Frame pacing
-            elapsed = time.monotonic() - current_time
-            sleep_time = FRAME_TIME - elapsed
-            if sleep_time > 0:
-                time.sleep(sleep_time)
-
-            last_time = current_time
+            # Sleep until the next frame deadline; on overrun, restart the
+            # schedule from now rather than rushing to catch up
+            next_frame += FRAME_TIME
+            now = time.monotonic()
+            if next_frame > now:
+                time.sleep(next_frame - now)
+            else:
+                next_frame = now
 
 
 def main(stdscr) -> None:
@@ -286,6 +476,9 @@ def signal_handler(signum, frame) -> None:
 
 
 if __name__ == "__main__":
+    # Initialize locale for proper Unicode rendering; process-wide, so once
+    locale.setlocale(locale.LC_ALL, "")
+
     # Register signal handlers before curses init
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)